@@ -1,28 +1,50 @@
 import os
 import io
+import asyncio
 import uuid
-import json
+import mmap
 import time
 import shutil
 import hashlib
 import mimetypes
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 
+import msgpack
+import numpy as np
+import orjson
 from fastapi import FastAPI, UploadFile, File
 from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-from .extractors import LocalPDFExtractor, DocAIExtractor
+from .extractors import (
+    LocalPDFExtractor, DocAIExtractor, PDFIUM_LOCK, add_soa, attach_shared_bboxes, extract_pages_shared, page_count,
+    quantize_bboxes, release_shared_bboxes
+)
+from .index import InvertedIndex
 from .intent import parse_intent
 from .search import find_income_by_month, find_client_name, generic_keyword_search
+from .uring_io import open_for_write
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 UPLOAD_DIR = BASE_DIR / "data" / "uploads"
 INDEX_DIR = BASE_DIR / "data" / "index"
 FRONTEND_DIR = BASE_DIR / "frontend"
 CACHE_DIR = BASE_DIR / "data" / "cache"
+INVERTED_DIR = INDEX_DIR / "inverted"  # one word -> pages file per document
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+EXTRACT_WORKERS = os.cpu_count() or 1
+EXTRACT_MIN_PAGES_PER_SHARD = 8
+INDEX_CACHE_SIZE = 128
+RENDER_PDF_CACHE_SIZE = 8
+RENDER_PREFETCH_PAGES = 2
+RENDER_MIN_SCALE = 0.1  # smaller scales round to zero-pixel bitmaps
 
 # Ensure modern static assets (ES modules, wasm) are served with the right MIME type
 mimetypes.add_type("application/javascript", ".mjs")
@@ -52,34 +74,202 @@ def _get_extractor():
         return DocAIExtractor(proj, loc, pid)
     return LocalPDFExtractor()
 
+# pdfium is not thread-safe, so local extraction is sharded by page range
+# over worker processes and kept off the event loop. Workers are spawned rather
+# than forked so they never inherit PDFIUM_LOCK held by a render thread.
+_EXTRACT_POOL = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+async def _extract(extractor, pdf_path: str) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    if not isinstance(extractor, LocalPDFExtractor):
+        return await loop.run_in_executor(None, extractor.extract, pdf_path)
+    n = await loop.run_in_executor(None, page_count, pdf_path)
+    shard = max(EXTRACT_MIN_PAGES_PER_SHARD, -(-n // EXTRACT_WORKERS))
+    futures = [
+        _EXTRACT_POOL.submit(extract_pages_shared, pdf_path, start, start + shard)
+        for start in range(0, n, shard)
+    ]
+    try:
+        parts = await asyncio.gather(*[asyncio.wrap_future(f) for f in futures], return_exceptions=True)
+    except asyncio.CancelledError:
+        # shards already running still finish in their worker; free their segments when they do
+        for f in futures:
+            f.add_done_callback(_release_shard)
+        raise
+    failed = [part for part in parts if isinstance(part, BaseException)]
+    if failed:
+        for part in parts:
+            if not isinstance(part, BaseException):
+                release_shared_bboxes(part[0])
+        raise failed[0]
+    return {"pages": [p for part in parts for p in attach_shared_bboxes(*part)]}
+
+def _release_shard(future):
+    if not future.cancelled() and future.exception() is None:
+        release_shared_bboxes(future.result()[0])
+
 def _index_path(doc_id: str) -> Path:
+    return INDEX_DIR / f"{doc_id}.mpk"
+
+def _legacy_index_path(doc_id: str) -> Path:
     return INDEX_DIR / f"{doc_id}.json"
 
+def _existing_index_path(doc_id: str) -> Path:
+    """msgpack index if present, else a JSON index written by older versions."""
+    p = _index_path(doc_id)
+    if not p.exists() and _legacy_index_path(doc_id).exists():
+        return _legacy_index_path(doc_id)
+    return p
+
+def _read_index_file(path: Path) -> Dict[str, Any]:
+    # both decoders read straight from the mapped file: no intermediate bytes/str copy
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if path.suffix == ".json":
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+        return msgpack.unpackb(mm, raw=False)
+
+def _arrays_path(doc_id: str) -> Path:
+    return INDEX_DIR / f"{doc_id}.npz"
+
 def _save_index(doc_id: str, meta: Dict[str, Any], extracted: Dict[str, Any]):
-    out = {"meta": meta, "extracted": extracted}
-    with open(_index_path(doc_id), "w", encoding="utf-8") as f:
-        json.dump(out, f)
+    # bbox arrays go to a sibling .npz; the msgpack index keeps everything else
+    arrays = {}
+    pages = []
+    for i, p in enumerate(extracted["pages"]):
+        p = dict(p)
+        bboxes = p.pop("bbox_u16", None)
+        if bboxes is not None:
+            arrays[f"p{i}"] = bboxes
+        pages.append(p)
+    # write-then-rename both files, arrays first: a crash mid-write must not leave a
+    # truncated .mpk that _scan_index would choke on at startup
+    if arrays:
+        arrays_path = _arrays_path(doc_id)
+        tmp = arrays_path.with_suffix(".npz.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, arrays_path)
+    out = {"meta": meta, "extracted": {**extracted, "pages": pages}}
+    index_path = _index_path(doc_id)
+    tmp = index_path.with_suffix(".mpk.tmp")
+    with open(tmp, "wb") as f:
+        f.write(msgpack.packb(out, use_bin_type=True))
+    os.replace(tmp, index_path)
 
 def _load_index(doc_id: str) -> Dict[str, Any]:
-    with open(_index_path(doc_id), "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Decoded index, served from memory until the file on disk changes.
+    The returned dict is shared between requests and must not be mutated."""
+    mtime = _existing_index_path(doc_id).stat().st_mtime_ns
+    return _load_index_cached(doc_id, mtime)
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _load_index_cached(doc_id: str, mtime: int) -> Dict[str, Any]:
+    j = _read_index_file(_existing_index_path(doc_id))
+    arrays_path = _arrays_path(doc_id)
+    if arrays_path.exists():
+        with np.load(arrays_path) as arrays:
+            for i, p in enumerate(j["extracted"]["pages"]):
+                if f"p{i}" in arrays:
+                    # older sidecars hold float32 bboxes; quantize_bboxes passes uint16 through
+                    p["bbox_u16"] = quantize_bboxes(arrays[f"p{i}"])
+    # pages indexed before the SoA arrays existed get them here, before the dict is shared;
+    # search only ever reads cached pages
+    for p in j["extracted"]["pages"]:
+        if "bbox_u16" not in p or "texts_lower" not in p:
+            add_soa(p, p.get("bbox_u16"))
+    return j
+
+def _doc_entry(meta: Dict[str, Any], extracted: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "doc_id": meta["doc_id"],
+        "name": meta["filename"],
+        "pages": len(extracted["pages"]),
+        "sha256": meta.get("sha256"),
+        "uploaded_at": meta.get("uploaded_at")
+    }
 
-def _list_docs() -> List[Dict[str, Any]]:
+def _scan_index() -> List[Dict[str, Any]]:
     docs = []
-    for p in INDEX_DIR.glob("*.json"):
-        with open(p, "r", encoding="utf-8") as f:
-            j = json.load(f)
-            docs.append({
-                "doc_id": p.stem,
-                "name": j["meta"]["filename"],
-                "pages": len(j["extracted"]["pages"]),
-                "sha256": j["meta"].get("sha256"),
-                "uploaded_at": j["meta"].get("uploaded_at")
-            })
+    # names starting with "_" are reserved for corpus-wide files
+    paths = [p for p in INDEX_DIR.glob("*.mpk") if not p.stem.startswith("_")]
+    paths += [p for p in INDEX_DIR.glob("*.json") if not _index_path(p.stem).exists()]
+    for p in paths:
+        j = _read_index_file(p)
+        docs.append(_doc_entry(j["meta"], j["extracted"]))
+    return docs
+
+# In-memory view of INDEX_DIR, built once at import and kept in sync by upload/delete
+# so requests don't re-parse every index file.
+_DOC_LIST: List[Dict[str, Any]] = _scan_index()
+_HASH_INDEX: Dict[str, Dict[str, Any]] = {d["sha256"]: d for d in _DOC_LIST if d["sha256"]}
+_INDEX_LOCK = asyncio.Lock()
+# sha256 -> future resolved when the upload currently indexing that content finishes
+_PENDING_HASHES: Dict[str, asyncio.Future] = {}
+
+def _list_docs() -> List[Dict[str, Any]]:
+    docs = _DOC_LIST.copy()
     # sort newest first by uploaded_at, fallback to name
     docs.sort(key=lambda d: (-(d["uploaded_at"] or 0), d["name"]))
     return docs
 
+def _iter_docs_with_index(docs: Optional[List[Dict[str, Any]]] = None) -> Iterator[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """(doc_id, meta, extracted) for each doc entry (default: all, newest first).
+    Each index is read once, through the LRU; documents deleted meanwhile are skipped."""
+    for d in (_list_docs() if docs is None else docs):
+        try:
+            j = _load_index(d["doc_id"])
+        except FileNotFoundError:
+            continue
+        yield d["doc_id"], j["meta"], j["extracted"]
+
+def _inverted_path(doc_id: str) -> Path:
+    return INVERTED_DIR / f"{doc_id}.mpk"
+
+def _persist_postings(doc_id: str, pages: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    postings = InvertedIndex.document_postings(pages)
+    InvertedIndex.save_document(_inverted_path(doc_id), postings)
+    return postings
+
+async def _claim_hash(sha256: str) -> Optional[Dict[str, Any]]:
+    """The existing doc entry for sha256, or None once the caller holds the reservation to
+    index it (release with _release_hash). Concurrent uploads of the same content wait for
+    the first one instead of indexing it twice."""
+    while True:
+        async with _INDEX_LOCK:
+            existing = _HASH_INDEX.get(sha256)
+            if existing:
+                return existing
+            pending = _PENDING_HASHES.get(sha256)
+            if pending is None:
+                _PENDING_HASHES[sha256] = asyncio.get_running_loop().create_future()
+                return None
+        # wait without inheriting its outcome; if that upload failed, try to claim it ourselves
+        await asyncio.wait([pending])
+
+def _release_hash(sha256: str):
+    _PENDING_HASHES.pop(sha256).set_result(None)
+
+def _open_inverted_index() -> InvertedIndex:
+    """Load the per-document postings files, rebuilding missing ones from the doc index
+    and dropping those whose document is gone."""
+    INVERTED_DIR.mkdir(parents=True, exist_ok=True)
+    # single-file layout from before postings were stored per document
+    (INDEX_DIR / "_inverted.mpk").unlink(missing_ok=True)
+    doc_ids = {d["doc_id"] for d in _DOC_LIST}
+    inverted = InvertedIndex()
+    for path in INVERTED_DIR.glob("*.mpk"):
+        if path.stem in doc_ids:
+            inverted.add_postings(path.stem, InvertedIndex.load_document(path))
+        else:
+            path.unlink(missing_ok=True)
+    missing = [d for d in _DOC_LIST if d["doc_id"] not in inverted.doc_postings]
+    for doc_id, _, extracted in _iter_docs_with_index(missing):
+        inverted.add_postings(doc_id, _persist_postings(doc_id, extracted["pages"]))
+    return inverted
+
+_INVERTED = _open_inverted_index()
+
 @app.post("/api/upload")
 async def upload(files: List[UploadFile] = File(...)):
     """
@@ -90,42 +280,50 @@ async def upload(files: List[UploadFile] = File(...)):
     extractor = _get_extractor()
     ids = []
 
-    # build hash -> (doc_id, name, pages) map from existing index
-    existing_by_hash: Dict[str, Dict[str, Any]] = {}
-    for p in INDEX_DIR.glob("*.json"):
-        with open(p, "r", encoding="utf-8") as f:
-            j = json.load(f)
-        h = j["meta"].get("sha256")
-        if h:
-            existing_by_hash[h] = {
-                "doc_id": j["meta"]["doc_id"],
-                "name": j["meta"]["filename"],
-                "pages": len(j["extracted"]["pages"])
-            }
-
     for file in files:
-        content = await file.read()
-        sha256 = hashlib.sha256(content).hexdigest()
-
-        if sha256 in existing_by_hash:
+        # stream to a temp file while hashing, so the upload is never held in memory
+        tmp = UPLOAD_DIR / f".{uuid.uuid4().hex}.part"
+        h = hashlib.sha256()
+        try:
+            async with open_for_write(tmp) as out:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    h.update(chunk)
+                    await out.write(chunk)
+        except Exception:
+            tmp.unlink(missing_ok=True)
+            raise
+        sha256 = h.hexdigest()
+
+        existing = await _claim_hash(sha256)
+        if existing:
             # return existing instead of duplicating
-            ids.append(existing_by_hash[sha256])
+            tmp.unlink(missing_ok=True)
+            ids.append({"doc_id": existing["doc_id"], "name": existing["name"], "pages": existing["pages"]})
             continue
 
-        doc_id = str(uuid.uuid4())[:8]
-        dest = UPLOAD_DIR / f"{doc_id}_{file.filename}"
-        with open(dest, "wb") as out:
-            out.write(content)
-
-        extracted = extractor.extract(str(dest))
-        meta = {
-            "doc_id": doc_id,
-            "filename": file.filename,
-            "path": str(dest),
-            "sha256": sha256,
-            "uploaded_at": time.time(),
-        }
-        _save_index(doc_id, meta, extracted)
+        try:
+            doc_id = str(uuid.uuid4())[:8]
+            dest = UPLOAD_DIR / f"{doc_id}_{file.filename}"
+            os.replace(tmp, dest)
+
+            extracted = await _extract(extractor, str(dest))
+            meta = {
+                "doc_id": doc_id,
+                "filename": file.filename,
+                "path": str(dest),
+                "sha256": sha256,
+                "uploaded_at": time.time(),
+            }
+            await asyncio.to_thread(_save_index, doc_id, meta, extracted)
+            # only this document's postings are built and written, off the event loop
+            postings = await asyncio.to_thread(_persist_postings, doc_id, extracted["pages"])
+            entry = _doc_entry(meta, extracted)
+            async with _INDEX_LOCK:
+                _DOC_LIST.append(entry)
+                _HASH_INDEX[sha256] = entry
+                _INVERTED.add_postings(doc_id, postings)
+        finally:
+            _release_hash(sha256)
         ids.append({"doc_id": doc_id, "name": file.filename, "pages": len(extracted["pages"])})
 
     return {"uploaded": ids}
@@ -137,34 +335,49 @@ def list_docs():
 @app.get("/api/doc/{doc_id}/file")
 def get_doc_file(doc_id: str):
     meta = _load_index(doc_id)["meta"]
-    return FileResponse(meta["path"], media_type="application/pdf", filename=meta["filename"])
+    # the stat isn't saved, only moved: it runs here in this sync handler's threadpool
+    # thread, so FileResponse skips its own extra thread hop to stat before sending headers
+    return FileResponse(meta["path"], media_type="application/pdf", filename=meta["filename"],
+                        stat_result=os.stat(meta["path"]))
 
 # ---------- Delete a document ----------
 @app.delete("/api/doc/{doc_id}")
-def delete_doc(doc_id: str):
-    idx = _index_path(doc_id)
+async def delete_doc(doc_id: str):
+    idx = _existing_index_path(doc_id)
     if not idx.exists():
         return {"deleted": False, "reason": "not_found"}
 
-    j = _load_index(doc_id)
-    # delete PDF file
+    async with _INDEX_LOCK:
+        for i, d in enumerate(_DOC_LIST):
+            if d["doc_id"] == doc_id:
+                del _DOC_LIST[i]
+                if _HASH_INDEX.get(d["sha256"]) is d:
+                    del _HASH_INDEX[d["sha256"]]
+                break
+        _INVERTED.remove_document(doc_id)
+
+    if not await asyncio.to_thread(_delete_doc_files, doc_id, idx):
+        return {"deleted": False, "reason": "not_found"}
+    return {"deleted": True}
+
+def _delete_doc_files(doc_id: str, idx: Path) -> bool:
+    """Remove everything stored on disk for doc_id; False if a concurrent delete got there first."""
     try:
-        os.remove(j["meta"]["path"])
+        j = _load_index(doc_id)
     except FileNotFoundError:
-        pass
-    except Exception:
-        pass
-
-    # delete cache dir for rendered images (if present)
-    shutil.rmtree(CACHE_DIR / doc_id, ignore_errors=True)
+        return False
+    # PDF file, open render handle and rendered images go together, so no render can slip in between
+    _drop_render_state(doc_id, j["meta"]["path"])
 
     # delete index
     try:
         idx.unlink()
     except FileNotFoundError:
         pass
-
-    return {"deleted": True}
+    _arrays_path(doc_id).unlink(missing_ok=True)
+    _inverted_path(doc_id).unlink(missing_ok=True)
+    _load_index_cached.cache_clear()
+    return True
 
 # ---------- Image rendering fallback ----------
 @app.get("/api/doc/{doc_id}/manifest")
@@ -176,67 +389,159 @@ def doc_manifest(doc_id: str):
         "pages": [{"width": p["width"], "height": p["height"]} for p in pages]
     }
 
+# Open pdfium documents by doc_id, least recently used evicted first. pdfium is not
+# thread-safe, so the cache is only touched while holding PDFIUM_LOCK.
+_PDF_CACHE: "OrderedDict[str, Any]" = OrderedDict()
+_PREFETCH_TASKS: Set[asyncio.Task] = set()
+
+def _cached_pdf(doc_id: str, pdf_path: str):
+    import pypdfium2 as pdfium
+    pdf = _PDF_CACHE.get(doc_id)
+    if pdf is None:
+        pdf = pdfium.PdfDocument(pdf_path)
+        _PDF_CACHE[doc_id] = pdf
+        while len(_PDF_CACHE) > RENDER_PDF_CACHE_SIZE:
+            _, evicted = _PDF_CACHE.popitem(last=False)
+            evicted.close()
+    else:
+        _PDF_CACHE.move_to_end(doc_id)
+    return pdf
+
+def _drop_render_state(doc_id: str, pdf_path: str):
+    """Delete a document's PDF and rendered pages. Under PDFIUM_LOCK, so renders queued
+    for it (e.g. prefetches) see the PDF gone and never reopen it or write PNGs."""
+    with PDFIUM_LOCK:
+        pdf = _PDF_CACHE.pop(doc_id, None)
+        if pdf is not None:
+            pdf.close()
+        try:
+            os.remove(pdf_path)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            pass
+        shutil.rmtree(CACHE_DIR / doc_id, ignore_errors=True)
+
+def _page_cache_path(doc_id: str, page: int, scale: float) -> Path:
+    return CACHE_DIR / doc_id / f"p{page}_s{scale:.2f}.png"
+
+def _render_page(doc_id: str, pdf_path: str, page: int, scale: float) -> Path:
+    """Render a page into the PNG cache unless it is already there."""
+    cache_name = _page_cache_path(doc_id, page, scale)
+    with PDFIUM_LOCK:
+        # re-check under the lock: a prefetch may have rendered it meanwhile
+        if cache_name.exists():
+            return cache_name
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(pdf_path)
+        page_obj = _cached_pdf(doc_id, pdf_path)[page]
+        # RGB byte order lets PIL take the buffer without swizzling; the pdfium bitmap is
+        # released straight away so only one image-sized buffer is alive while encoding
+        bitmap = page_obj.render(scale=scale, rev_byteorder=True)
+        image = bitmap.to_pil()
+        bitmap.close()
+        page_obj.close()
+    # encode outside the lock, then write-then-rename so concurrent readers never see a
+    # partial PNG; the PDF is re-checked so a document deleted meanwhile stays deleted
+    tmp = CACHE_DIR / f".{uuid.uuid4().hex}.tmp"
+    image.save(tmp, "PNG")
+    with PDFIUM_LOCK:
+        if not os.path.exists(pdf_path):
+            tmp.unlink(missing_ok=True)
+            raise FileNotFoundError(pdf_path)
+        cache_name.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, cache_name)
+    return cache_name
+
+def _prefetch_page(doc_id: str, pdf_path: str, page: int, scale: float):
+    try:
+        _render_page(doc_id, pdf_path, page, scale)
+    except Exception:
+        pass  # best effort; a real request for the page will report the error
+
 @app.get("/api/doc/{doc_id}/page/{page}.png")
-def doc_page_png(doc_id: str, page: int, scale: float = 1.25):
-    """Render a given page to PNG (fallback viewer)."""
-    j = _load_index(doc_id)
+async def doc_page_png(doc_id: str, page: int, scale: float = 1.25):
+    """Render a given page to PNG (fallback viewer), warming the neighbouring pages in the background."""
+    # an LRU miss decodes the msgpack + .npz index; keep that off the event loop
+    j = await asyncio.to_thread(_load_index, doc_id)
     meta = j["meta"]
     pdf_path = meta["path"]
 
     if page < 0:
         page = 0
+    # two decimals keep the frontend's 1.25 exact and bound the cache key space
+    scale = max(round(scale, 2), RENDER_MIN_SCALE)
     try:
-        import fitz  # PyMuPDF
-    except Exception as e:
-        return Response(content=f"PyMuPDF not installed: {e}", media_type="text/plain", status_code=500)
-
-    page_cache_dir = CACHE_DIR / doc_id
-    page_cache_dir.mkdir(parents=True, exist_ok=True)
-    cache_name = page_cache_dir / f"p{page}_s{scale:.2f}.png"
-    if cache_name.exists():
-        return FileResponse(str(cache_name), media_type="image/png")
-
-    try:
-        doc = fitz.open(pdf_path)
-        page_obj = doc[page]
-        mat = fitz.Matrix(scale, scale)
-        pix = page_obj.get_pixmap(matrix=mat, alpha=False)
-        png_bytes = pix.tobytes("png")
-        doc.close()
+        import pypdfium2  # noqa: F401
     except Exception as e:
-        return Response(content=f"Render failed: {e}", media_type="text/plain", status_code=500)
+        return Response(content=f"pypdfium2 not installed: {e}", media_type="text/plain", status_code=500)
+
+    cache_name = _page_cache_path(doc_id, page, scale)
+    if not cache_name.exists():
+        try:
+            cache_name = await asyncio.to_thread(_render_page, doc_id, pdf_path, page, scale)
+        except Exception as e:
+            return Response(content=f"Render failed: {e}", media_type="text/plain", status_code=500)
+
+    n_pages = len(j["extracted"]["pages"])
+    for neighbour in range(page - RENDER_PREFETCH_PAGES, page + RENDER_PREFETCH_PAGES + 1):
+        if neighbour == page or not 0 <= neighbour < n_pages:
+            continue
+        if _page_cache_path(doc_id, neighbour, scale).exists():
+            continue
+        task = asyncio.create_task(asyncio.to_thread(_prefetch_page, doc_id, pdf_path, neighbour, scale))
+        _PREFETCH_TASKS.add(task)
+        task.add_done_callback(_PREFETCH_TASKS.discard)
 
-    with open(cache_name, "wb") as f:
-        f.write(png_bytes)
     return FileResponse(str(cache_name), media_type="image/png")
 
 # ---------- Chat / search ----------
+def _search_doc(meta: Dict[str, Any], extracted: Dict[str, Any], intent: Dict[str, Any],
+                kws: Optional[List[str]], page_idxs: Optional[Set[int]]) -> Optional[Dict[str, Any]]:
+    """Run the intent's search over one document; None when it has no hits."""
+    pages = extracted["pages"]
+    if intent["field"] == "income":
+        hits = find_income_by_month(pages, intent["month"])
+    elif intent["field"] == "client_name":
+        hits = find_client_name(pages)
+    else:
+        hits = generic_keyword_search(pages, kws, page_idxs=page_idxs)
+
+    if not hits:
+        return None
+    return {
+        "doc_id": meta["doc_id"],
+        "doc_name": meta["filename"],
+        "total_hits": len(hits),
+        "highlights": hits
+    }
+
 @app.post("/api/chat")
 async def chat(payload: ChatPayload):
     intent = parse_intent(payload.message)
-    results = []
-    for d in _list_docs():
-        j = _load_index(d["doc_id"])
-        pages = j["extracted"]["pages"]
-        if intent["field"] == "income":
-            hits = find_income_by_month(pages, intent["month"])
-        elif intent["field"] == "client_name":
-            hits = find_client_name(pages)
-        elif intent["field"] == "iban":
-            hits = generic_keyword_search(pages, ["IBAN"])
-        elif intent["field"] == "address":
-            hits = generic_keyword_search(pages, ["Address", "Adres"])
-        else:
-            kws = [w for w in payload.message.split() if len(w) > 2]
-            hits = generic_keyword_search(pages, kws)
-
-        if hits:
-            results.append({
-                "doc_id": d["doc_id"],
-                "doc_name": d["name"],
-                "total_hits": len(hits),
-                "highlights": hits
-            })
+    if intent["field"] == "iban":
+        kws = ["IBAN"]
+    elif intent["field"] == "address":
+        kws = ["Address", "Adres"]
+    elif intent["field"] == "generic":
+        kws = [w for w in payload.message.split() if len(w) > 2]
+    else:
+        kws = None
+    def select_docs():
+        # keyword searches only visit the documents and pages the inverted index points at;
+        # the vocabulary scan and the index decode share one worker thread
+        candidates = _INVERTED.candidates(kws) if kws is not None else None
+        docs = [d for d in _list_docs() if candidates is None or d["doc_id"] in candidates]
+        return candidates, list(_iter_docs_with_index(docs))
+
+    # one pass pairs each doc with its decoded index, then one thread per document searches it
+    candidates, indexed = await asyncio.to_thread(select_docs)
+    found = await asyncio.gather(*[
+        asyncio.to_thread(_search_doc, meta, extracted, intent, kws,
+                          candidates[doc_id] if candidates is not None else None)
+        for doc_id, meta, extracted in indexed
+    ])
+    results = [r for r in found if r]
 
     order = []
     for r in results:
@@ -1,6 +1,10 @@
 
 import os
-from typing import Dict, List, Any
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
 
 def _norm_bbox(b, page_width, page_height):
     x0, y0, x1, y1 = b
@@ -11,34 +15,151 @@ def _norm_bbox(b, page_width, page_height):
         max(0.0, min(1.0, y1 / page_height)),
     ]
 
+BBOX_SCALE = 65535  # quantized bbox units per normalized page length
+
+def quantize_bboxes(bboxes) -> np.ndarray:
+    """Normalized [0..1] bboxes -> contiguous (n, 4) uint16 array in 1/BBOX_SCALE units."""
+    arr = np.asarray(bboxes)
+    if arr.dtype == np.uint16:
+        return arr.reshape(-1, 4)
+    arr = np.clip(np.asarray(bboxes, dtype=np.float32).reshape(-1, 4), 0.0, 1.0)
+    return np.round(arr * BBOX_SCALE).astype(np.uint16)
+
+def add_soa(page: Dict[str, Any], bboxes=None) -> Dict[str, Any]:
+    """Add the structure-of-arrays layout search indexes by position: texts, texts_lower
+    and bbox_u16 (see quantize_bboxes). bboxes default to each word's "bbox"; the word
+    dicts themselves are left untouched."""
+    words = page["words"]
+    texts = [w["text"] for w in words]
+    page["texts"] = texts
+    page["texts_lower"] = [t.lower() for t in texts]
+    page["bbox_u16"] = quantize_bboxes([w["bbox"] for w in words] if bboxes is None else bboxes)
+    return page
+
+# pdfium is not thread-safe; every call into it from a shared process goes through this lock.
+PDFIUM_LOCK = threading.Lock()
+
+def _pdfium():
+    try:
+        import pypdfium2 as pdfium
+    except Exception as e:
+        raise RuntimeError("pypdfium2 is required. Please install it.") from e
+    return pdfium
+
+def _extract_page(page) -> Dict[str, Any]:
+    """Build words from pdfium's char stream: whitespace splits words, newlines split lines."""
+    import pypdfium2.raw as pdfium_c
+    w, h = page.get_size()
+    textpage = page.get_textpage()
+    words_struct = []
+    bboxes = []
+    line_no = word_no = 0
+    chars: List[str] = []
+    box = None  # running [left, bottom, right, top] of the current word
+    n_chars = textpage.count_chars()
+    for i in range(n_chars + 1):
+        ch = chr(pdfium_c.FPDFText_GetUnicode(textpage.raw, i)) if i < n_chars else "\n"
+        if not ch.isspace():
+            l, b, r, t = textpage.get_charbox(i)
+            if box is None:
+                box = [l, b, r, t]
+            else:
+                box = [min(box[0], l), min(box[1], b), max(box[2], r), max(box[3], t)]
+            chars.append(ch)
+            continue
+        if chars:
+            # pdfium's origin is bottom-left; flip to top-left like the other extractors
+            bboxes.append(_norm_bbox([box[0], h - box[3], box[2], h - box[1]], w, h))
+            words_struct.append({
+                "text": "".join(chars),
+                "block": 0,
+                "line": line_no,
+                "word": word_no,
+            })
+            word_no += 1
+            chars, box = [], None
+        if ch == "\n":
+            line_no += 1
+            word_no = 0
+    textpage.close()
+    return add_soa({"width": w, "height": h, "words": words_struct}, bboxes)
+
+def page_count(pdf_path: str) -> int:
+    pdfium = _pdfium()
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        n = len(pdf)
+        pdf.close()
+    return n
+
+def extract_pages(pdf_path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """Extract pages [start, end). Top-level so it can run in a worker process."""
+    pdfium = _pdfium()
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        pages = []
+        for i in range(start, min(end, len(pdf))):
+            page = pdf[i]
+            pages.append(_extract_page(page))
+            page.close()
+        pdf.close()
+    return pages
+
+def extract_pages_shared(pdf_path: str, start: int, end: int) -> Tuple[Optional[str], List[int], List[Dict[str, Any]]]:
+    """extract_pages for worker processes: the pages' bbox_u16 arrays are packed into one
+    POSIX shared memory segment so only its name crosses the pipe, not the pickled bytes.
+    Returns (segment name or None, words per page, pages without bbox_u16); the caller
+    restores the arrays with attach_shared_bboxes, or drops them with release_shared_bboxes.
+    Spawned workers share the parent's resource tracker, so a segment nobody frees is still
+    unlinked when the server exits."""
+    pages = extract_pages(pdf_path, start, end)
+    arrays = [p.pop("bbox_u16") for p in pages]
+    counts = [len(a) for a in arrays]
+    if not sum(counts):
+        return None, counts, pages
+    packed = np.concatenate(arrays)
+    shm = shared_memory.SharedMemory(create=True, size=packed.nbytes)
+    np.ndarray(packed.shape, dtype=packed.dtype, buffer=shm.buf)[:] = packed
+    shm.close()
+    return shm.name, counts, pages
+
+def attach_shared_bboxes(name: Optional[str], counts: List[int], pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy bbox_u16 arrays out of an extract_pages_shared segment into pages, then unlink it."""
+    if name is None:
+        for p in pages:
+            p["bbox_u16"] = np.zeros((0, 4), dtype=np.uint16)
+        return pages
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        packed = np.ndarray((sum(counts), 4), dtype=np.uint16, buffer=shm.buf)
+        offset = 0
+        for p, n in zip(pages, counts):
+            p["bbox_u16"] = packed[offset:offset + n].copy()
+            offset += n
+        del packed
+    finally:
+        shm.close()
+        shm.unlink()
+    return pages
+
+def release_shared_bboxes(name: Optional[str]):
+    """Unlink an extract_pages_shared segment whose pages are being discarded."""
+    if name is None:
+        return
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
 class LocalPDFExtractor:
     """Lightweight extractor: words + normalized bounding boxes (0..1)."""
     def __init__(self):
-        try:
-            import fitz  # PyMuPDF
-        except Exception as e:
-            raise RuntimeError("PyMuPDF (fitz) is required. Please install it.") from e
-        self.fitz = fitz
+        self.pdfium = _pdfium()
 
     def extract(self, pdf_path: str) -> Dict[str, Any]:
-        doc = self.fitz.open(pdf_path)
-        pages: List[Dict[str, Any]] = []
-        for page_idx in range(len(doc)):
-            page = doc[page_idx]
-            w, h = page.rect.width, page.rect.height
-            words = page.get_text("words")
-            words_struct = []
-            for x0, y0, x1, y1, text, block_no, line_no, word_no in words:
-                words_struct.append({
-                    "text": text,
-                    "bbox": _norm_bbox([x0, y0, x1, y1], w, h),
-                    "block": int(block_no),
-                    "line": int(line_no),
-                    "word": int(word_no),
-                })
-            pages.append({"width": w, "height": h, "words": words_struct})
-        doc.close()
-        return {"pages": pages}
+        return {"pages": extract_pages(pdf_path, 0, page_count(pdf_path))}
 
 class DocAIExtractor:
     """Optional: Google Document AI extractor using 'process_document'.
@@ -70,17 +191,17 @@ class DocAIExtractor:
             page_width = p.dimension.width or 1.0
             page_height = p.dimension.height or 1.0
             words_struct = []
+            bboxes = []
             for token in p.tokens:
                 text = _text_for_layout(doc, token.layout)
-                bbox = _poly_to_bbox(token.layout.bounding_poly, page_width, page_height)
+                bboxes.append(_poly_to_bbox(token.layout.bounding_poly, page_width, page_height))
                 words_struct.append({
                     "text": text,
-                    "bbox": bbox,
                     "block": 0,
                     "line": 0,
                     "word": 0,
                 })
-            pages_out.append({"width": page_width, "height": page_height, "words": words_struct})
+            pages_out.append(add_soa({"width": page_width, "height": page_height, "words": words_struct}, bboxes))
         return {"pages": pages_out}
 
 def _text_for_layout(document, layout) -> str:
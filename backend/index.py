@@ -0,0 +1,69 @@
+
+import os
+import mmap
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Set
+
+import msgpack
+
+class InvertedIndex:
+    """Cross-document word index: lowercased word -> {doc_id: pages containing it}.
+    Keywords match as substrings of words (like generic_keyword_search), so a lookup
+    scans the vocabulary instead of every word in every document.
+    Each document's own {word: pages} map is kept too, so it can be persisted and
+    removed without touching the other documents.
+    """
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        self.doc_postings: Dict[str, Dict[str, List[int]]] = {}
+
+    @staticmethod
+    def document_postings(pages: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+        """word -> ascending page indexes for one document."""
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for p_idx, p in enumerate(pages):
+            texts_lower = p.get("texts_lower") or [w["text"].lower() for w in p["words"]]
+            for t in set(texts_lower):
+                postings[t].append(p_idx)
+        return dict(postings)
+
+    def add_postings(self, doc_id: str, doc_postings: Dict[str, List[int]]):
+        self.remove_document(doc_id)
+        for token, pages in doc_postings.items():
+            self.postings.setdefault(token, {})[doc_id] = pages
+        self.doc_postings[doc_id] = doc_postings
+
+    def remove_document(self, doc_id: str):
+        for token in self.doc_postings.pop(doc_id, ()):
+            docs = self.postings[token]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[token]
+
+    def candidates(self, keywords: Iterable[str]) -> Dict[str, Set[int]]:
+        """doc_id -> page indexes that contain at least one keyword hit (case-insensitive).
+        Safe to call from a worker thread while the event loop adds or removes documents:
+        list() copies each dict in one step under the GIL, so the scan never iterates a
+        dict that is changing size."""
+        kws = [kw.lower() for kw in keywords]
+        pages: Dict[str, Set[int]] = defaultdict(set)
+        if not kws:
+            return pages
+        for token, docs in list(self.postings.items()):
+            if any(kw in token for kw in kws):
+                for doc_id, p_idxs in list(docs.items()):
+                    pages[doc_id].update(p_idxs)
+        return pages
+
+    @staticmethod
+    def save_document(path: Path, doc_postings: Dict[str, List[int]]):
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(msgpack.packb(doc_postings, use_bin_type=True))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load_document(path: Path) -> Dict[str, List[int]]:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return msgpack.unpackb(mm, raw=False)
@@ -1,12 +1,23 @@
 
 import regex as re
-from typing import Optional, Dict
+from typing import Dict
 
 MONTHS = {
     "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
     "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12
 }
 
+# One alternation scanned once per query; the named group that fired says what was seen.
+# Month names must be whole words, the other terms only need to start a word.
+_INTENT_RE = re.compile(
+    r"\b(?:(?P<income>income|salary|earnings|pay)"
+    r"|(?P<role>client|borrower|applicant|customer)"
+    r"|(?P<name>name)"
+    r"|(?P<iban>iban)"
+    r"|(?P<address>address)"
+    r"|(?P<month>" + "|".join(MONTHS) + r")\b)"
+)
+
 def parse_intent(q: str) -> Dict:
     """Very lightweight intent parser.
     Returns a dict with keys:
@@ -16,17 +27,22 @@ def parse_intent(q: str) -> Dict:
       - cross_docs: bool
     """
     s = q.strip().lower()
-    month = _extract_month(s)
+    seen = set()
+    month = None
+    for m in _INTENT_RE.finditer(s):
+        seen.add(m.lastgroup)
+        if m.lastgroup == "month" and month is None:
+            month = MONTHS[m.group("month")]
     cross_docs = "all docs" in s or "all documents" in s or "every document" in s
 
     # FIELD detection
-    if any(w in s for w in ["income", "salary", "earnings", "pay"]):
+    if "income" in seen:
         field = "income"
-    elif "name" in s and any(w in s for w in ["client", "borrower", "applicant", "customer"]):
+    elif "name" in seen and "role" in seen:
         field = "client_name"
-    elif "iban" in s:
+    elif "iban" in seen:
         field = "iban"
-    elif "address" in s:
+    elif "address" in seen:
         field = "address"
     else:
         field = "generic"  # fallback: keyword search
@@ -38,9 +54,3 @@ def parse_intent(q: str) -> Dict:
         "cross_docs": cross_docs,
         "raw": q,
     }
-
-def _extract_month(s: str) -> Optional[int]:
-    for name, idx in MONTHS.items():
-        if re.search(rf"\b{name}\b", s):
-            return idx
-    return None
@@ -1,7 +1,13 @@
 
-from typing import List, Dict, Any, Optional
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import ahocorasick
+import numpy as np
 import regex as re
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
+
+from .extractors import BBOX_SCALE
 
 AmountRegex = re.compile(r"(?:(?:€|\$|£)?\s?\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})?)")
 
@@ -20,34 +26,40 @@ MONTH_WORDS = {
     12: ["december", "dec"],
 }
 
-def _words_to_lines(words: List[Dict[str, Any]], y_tol: float = 0.01) -> List[List[Dict[str, Any]]]:
-    """Group words into line-like clusters by y center proximity."""
-    rows: List[List[Dict[str, Any]]] = []
-    centers = []
-    for w in words:
-        x0,y0,x1,y1 = w["bbox"]
-        centers.append(((y0+y1)/2.0, w))
-    centers.sort(key=lambda t: t[0])
-    for _, w in centers:
-        y_center = (w["bbox"][1]+w["bbox"][3])/2.0
-        placed = False
-        for row in rows:
-            y0,y1 = row[0]["bbox"][1], row[0]["bbox"][3]
-            y_center_row = (y0+y1)/2.0
-            if abs(y_center - y_center_row) <= y_tol:
-                row.append(w)
-                placed = True
-                break
-        if not placed:
-            rows.append([w])
-    for r in rows:
-        r.sort(key=lambda w: w["bbox"][0])
+INCOME_TERMS = ("income", "salary", "earnings", "wage", "net", "gross", "loon", "inkomen")
+INCOME_SET = frozenset(INCOME_TERMS)
+
+@lru_cache(maxsize=65536)
+def _is_income_term(token: str) -> bool:
+    """Exact term hit, else fuzzy partial_ratio >= 80 against any term.
+    Memoized per distinct token, so the fuzzy scoring runs once per vocabulary word rather than per occurrence."""
+    if token in INCOME_SET:
+        return True
+    return process.extractOne(token, INCOME_TERMS, scorer=fuzz.partial_ratio, score_cutoff=80) is not None
+
+def _rect(bboxes: np.ndarray, i: int) -> List[float]:
+    """Float bbox for the hits payload; the quantized array is the only stored form."""
+    return (bboxes[i] / BBOX_SCALE).tolist()
+
+def _words_to_lines(bboxes: np.ndarray, y_tol: float = 0.01) -> List[np.ndarray]:
+    """Group word indices into line-like clusters by y center proximity.
+    A new row starts wherever the gap between consecutive y-sorted centers exceeds y_tol."""
+    if not len(bboxes):
+        return []
+    # y0 + y1 in quantized units: twice the center, so the tolerance doubles too
+    yc = bboxes[:, 1].astype(np.int32) + bboxes[:, 3]
+    order = np.argsort(yc, kind="stable")
+    breaks = np.diff(yc[order]) > 2 * y_tol * BBOX_SCALE
+    rows: List[np.ndarray] = []
+    for idxs in np.split(order, np.flatnonzero(breaks) + 1):
+        rows.append(idxs[np.argsort(bboxes[idxs, 0], kind="stable")])
     return rows
 
-def _collect_amounts_near(words: List[Dict[str, Any]], anchor_idx: int, window: int = 6) -> List[int]:
+def _collect_amounts_near(amount_mask: List[bool], anchor_idx: int, window: int = 6) -> List[int]:
+    """Indexes within window of the anchor whose token is an amount (mask precomputed per line)."""
     hits = []
-    for i in range(max(0, anchor_idx-window), min(len(words), anchor_idx+window+1)):
-        if AmountRegex.fullmatch(words[i]["text"]):
+    for i in range(max(0, anchor_idx-window), min(len(amount_mask), anchor_idx+window+1)):
+        if amount_mask[i]:
             hits.append(i)
     return hits
 
@@ -56,32 +68,32 @@ def find_income_by_month(pages: List[Dict[str, Any]], month: Optional[int]) -> L
     month_terms = None
     if month is not None:
         month_terms = MONTH_WORDS.get(month, [])
-    income_terms = ["income", "salary", "earnings", "wage", "net", "gross", "loon", "inkomen"]
 
     for p_idx, p in enumerate(pages):
-        words = p["words"]
-        line_groups = _words_to_lines(words)
-        for line in line_groups:
-            texts = [w["text"] for w in line]
-            lc = [t.lower() for t in texts]
+        bboxes, page_texts, page_lower = p["bbox_u16"], p["texts"], p["texts_lower"]
+        for line in _words_to_lines(bboxes):
+            texts = [page_texts[i] for i in line]
+            lc = [page_lower[i] for i in line]
             month_positions = []
             income_positions = []
             for i, t in enumerate(lc):
                 if month_terms and any(mt in t for mt in month_terms):
                     month_positions.append(i)
-                if any(fuzz.partial_ratio(t, it) >= 80 for it in income_terms):
+                if _is_income_term(t):
                     income_positions.append(i)
             anchors = month_positions or income_positions
             if not anchors:
                 continue
+            # match each token once per line, not once per overlapping anchor window
+            amount_mask = [AmountRegex.fullmatch(t) is not None for t in texts]
             for a in anchors:
-                amount_idxs = _collect_amounts_near(line, a, window=6)
+                amount_idxs = _collect_amounts_near(amount_mask, a, window=6)
                 for idx in amount_idxs:
-                    amt_word = line[idx]
+                    w_idx = line[idx]
                     hits.append({
                         "page": p_idx,
-                        "rects": [amt_word["bbox"]],
-                        "label": f"Amount: {amt_word['text']}",
+                        "rects": [_rect(bboxes, w_idx)],
+                        "label": f"Amount: {texts[idx]}",
                         "score": 0.82,
                     })
     return hits
@@ -91,17 +103,17 @@ def find_client_name(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     label_terms = ["name", "borrower", "applicant", "client", "customer"]
     hits: List[Dict[str, Any]] = []
     for p_idx, p in enumerate(pages):
-        line_groups = _words_to_lines(p["words"])
-        for line in line_groups:
-            lc = [w["text"].lower() for w in line]
-            for i, t in enumerate(lc):
+        bboxes, page_texts, page_lower = p["bbox_u16"], p["texts"], p["texts_lower"]
+        for line in _words_to_lines(bboxes):
+            for i, w_idx in enumerate(line):
+                t = page_lower[w_idx]
                 if any(t.startswith(term) for term in label_terms):
                     captured = []
                     for j in range(i+1, min(i+5, len(line))):
-                        token = line[j]["text"]
+                        token = page_texts[line[j]]
                         if re.search(r"[,:;/\-]", token):
                             break
-                        captured.append((token, line[j]["bbox"]))
+                        captured.append((token, _rect(bboxes, line[j])))
                     if captured:
                         rects = [b for (_, b) in captured]
                         label = "Name: " + " ".join(w for (w, _) in captured)
@@ -113,15 +125,40 @@ def find_client_name(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                         })
     return hits
 
-def generic_keyword_search(pages: List[Dict[str, Any]], keywords: List[str]) -> List[Dict[str, Any]]:
+@lru_cache(maxsize=64)
+def _keyword_automaton(kws: Tuple[str, ...]) -> "ahocorasick.Automaton":
+    automaton = ahocorasick.Automaton()
+    for kw in kws:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+def generic_keyword_search(pages: List[Dict[str, Any]], keywords: List[str],
+                           page_idxs: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+    """Substring match of keywords against words; page_idxs limits the scan to known candidate pages.
+    All keywords are matched in one Aho-Corasick pass over the page's space-joined lowercased text."""
     hits: List[Dict[str, Any]] = []
-    for p_idx, p in enumerate(pages):
-        for w in p["words"]:
-            if any(kw.lower() in w["text"].lower() for kw in keywords):
-                hits.append({
-                    "page": p_idx,
-                    "rects": [w["bbox"]],
-                    "label": f"Matched: {w['text']}",
-                    "score": 0.6
-                })
+    kws = tuple(sorted({kw.lower() for kw in keywords if kw}))
+    if not kws:
+        return hits
+    automaton = _keyword_automaton(kws)
+    for p_idx in (sorted(page_idxs) if page_idxs is not None else range(len(pages))):
+        p = pages[p_idx]
+        bboxes, page_texts, page_lower = p["bbox_u16"], p["texts"], p["texts_lower"]
+        # starts[i] is the offset of word i in joined; keywords come from whitespace-split
+        # input, so a match always falls inside a single word
+        starts = []
+        pos = 0
+        for t in page_lower:
+            starts.append(pos)
+            pos += len(t) + 1
+        joined = " ".join(page_lower)
+        matched = sorted({bisect_right(starts, end) - 1 for end, _ in automaton.iter(joined)})
+        for i in matched:
+            hits.append({
+                "page": p_idx,
+                "rects": [_rect(bboxes, i)],
+                "label": f"Matched: {page_texts[i]}",
+                "score": 0.6
+            })
     return hits
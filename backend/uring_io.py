@@ -0,0 +1,176 @@
+
+import os
+import queue
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import aiofiles
+
+class IoUringBatchEngine:
+    """One io_uring shared by the whole process (Linux, `pip install liburing`).
+    Writes are queued from any event loop; a background thread packs everything queued
+    into SQEs, submits them with one syscall and resolves each caller's Future from its CQE.
+    """
+    def __init__(self, entries: int = 64):
+        import liburing
+        self.liburing = liburing
+        self.entries = entries
+        self._ring = liburing.Ring()
+        liburing.io_uring_queue_init(entries, self._ring)
+        self._queue: "queue.SimpleQueue[Tuple[int, bytes, int, asyncio.AbstractEventLoop, asyncio.Future]]" = queue.SimpleQueue()
+        # user_data -> (data, loop, future); holding data keeps the buffer alive until completion
+        self._in_flight: Dict[int, Tuple[bytes, asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        # set (under _state_lock) once the ring thread has died; later writes fail straight away
+        self.failed: Optional[BaseException] = None
+        self._state_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="io-uring", daemon=True)
+        self._thread.start()
+
+    def write(self, fd: int, data: bytes, offset: int) -> "asyncio.Future[int]":
+        """Queue a pwrite; the Future resolves to the number of bytes written."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        with self._state_lock:
+            if self.failed is not None:
+                raise OSError("io_uring engine stopped") from self.failed
+            self._queue.put((fd, data, offset, loop, fut))
+        return fut
+
+    def _run(self):
+        try:
+            self._serve()
+        except BaseException as e:
+            # fail everything still waiting so no caller hangs; get_engine stops handing us out
+            with self._state_lock:
+                self.failed = e
+            error = OSError(f"io_uring engine stopped: {e!r}")
+            for _, loop, fut in self._in_flight.values():
+                loop.call_soon_threadsafe(_resolve, fut, error)
+            while True:
+                try:
+                    _, _, _, loop, fut = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                loop.call_soon_threadsafe(_resolve, fut, error)
+
+    def _serve(self):
+        L = self.liburing
+        cqe = L.Cqe()
+        in_flight = self._in_flight
+        next_id = 1
+        while True:
+            ops = [] if in_flight else [self._queue.get()]
+            while len(in_flight) + len(ops) < self.entries:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for fd, data, offset, loop, fut in ops:
+                sqe = L.io_uring_get_sqe(self._ring)
+                L.io_uring_prep_write(sqe, fd, data, offset)
+                L.io_uring_sqe_set_data64(sqe, next_id)
+                in_flight[next_id] = (data, loop, fut)
+                next_id += 1
+            if ops:
+                L.io_uring_submit(self._ring)
+
+            # reap one CQE at a time: only cqe[0] is valid after a wait/peek, and marking
+            # each one seen keeps the CQ head right across ring wrap-around
+            try:
+                L.io_uring_wait_cqe(self._ring, cqe)
+            except OSError:
+                pass  # a failed op surfaces as an error CQE; it is read from the entry below
+            while True:
+                entry = cqe[0]
+                user_data = entry.user_data
+                try:
+                    result: Any = entry.res
+                except OSError as e:
+                    result = e
+                L.io_uring_cqe_seen(self._ring, entry)
+                if user_data not in in_flight:
+                    raise RuntimeError(f"io_uring completion for unknown user_data {user_data}")
+                _, loop, fut = in_flight.pop(user_data)
+                loop.call_soon_threadsafe(_resolve, fut, result)
+                try:
+                    L.io_uring_peek_cqe(self._ring, cqe)
+                except BlockingIOError:
+                    break
+
+def _resolve(fut: asyncio.Future, result: Any):
+    if fut.cancelled():
+        return
+    if isinstance(result, BaseException):
+        fut.set_exception(result)
+    else:
+        fut.set_result(result)
+
+_ENGINE: Optional[IoUringBatchEngine] = None
+_ENGINE_LOCK = threading.Lock()
+_ENGINE_UNAVAILABLE = False
+
+def get_engine() -> Optional[IoUringBatchEngine]:
+    """The shared engine, or None when liburing is missing, the kernel refuses io_uring
+    or the engine has died (callers then fall back to aiofiles)."""
+    global _ENGINE, _ENGINE_UNAVAILABLE
+    if _ENGINE is not None and _ENGINE.failed is not None:
+        # keep the dead engine referenced: its in-flight buffers may still be read by the kernel
+        _ENGINE_UNAVAILABLE = True
+    if _ENGINE_UNAVAILABLE:
+        return None
+    if _ENGINE is not None:
+        return _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None and not _ENGINE_UNAVAILABLE:
+            try:
+                _ENGINE = IoUringBatchEngine()
+            except Exception:
+                _ENGINE_UNAVAILABLE = True
+    return None if _ENGINE_UNAVAILABLE else _ENGINE
+
+def _close_after(fut: asyncio.Future, fd: int):
+    if not fut.cancelled():
+        fut.exception()  # nobody awaits it any more; mark a failure as retrieved
+    os.close(fd)
+
+class _UringWriter:
+    def __init__(self, engine: IoUringBatchEngine, fd: int):
+        self.engine = engine
+        self.fd = fd
+        self.offset = 0
+        # the op last handed to the engine; it completes even if our caller is cancelled
+        self.pending: Optional[asyncio.Future] = None
+
+    async def write(self, data: bytes) -> int:
+        written = 0
+        while written < len(data):
+            # regular files rarely short-write, but resubmit the tail if they do
+            self.pending = self.engine.write(self.fd, data if not written else data[written:], self.offset)
+            n = await asyncio.shield(self.pending)
+            if n == 0:
+                raise OSError("io_uring write made no progress")
+            self.offset += n
+            written += n
+        return written
+
+@asynccontextmanager
+async def open_for_write(path):
+    """Async binary writer for path: io_uring when available, aiofiles otherwise."""
+    engine = get_engine()
+    if engine is None:
+        async with aiofiles.open(path, "wb") as f:
+            yield f
+        return
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    writer = _UringWriter(engine, fd)
+    try:
+        yield writer
+    finally:
+        if writer.pending is None or writer.pending.done():
+            os.close(fd)
+        else:
+            # e.g. cancelled mid-write: the op may not even be submitted yet, and closing now
+            # would let it land in whatever file reuses the fd number
+            writer.pending.add_done_callback(lambda fut: _close_after(fut, fd))
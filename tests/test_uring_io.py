@@ -0,0 +1,86 @@
+import os
+import asyncio
+import tempfile
+import unittest
+
+from backend import uring_io
+from backend.uring_io import IoUringBatchEngine, get_engine, open_for_write
+
+@unittest.skipIf(get_engine() is None, "io_uring unavailable (needs Linux and `pip install liburing`)")
+class UringWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name: str, chunk: bytes, n: int):
+        path = os.path.join(self.tmp.name, name)
+        async def run():
+            async with open_for_write(path) as out:
+                for _ in range(n):
+                    await out.write(chunk)
+            return path
+        return run()
+
+    def test_concurrent_writers(self):
+        # several writers keep many CQEs ready at once and wrap the completion ring
+        for writers, chunk_size in [(2, 16 << 10), (8, 64 << 10)]:
+            chunks = [os.urandom(chunk_size) for _ in range(writers)]
+            n = (4 << 20) // chunk_size
+            async def run():
+                return await asyncio.wait_for(asyncio.gather(*[
+                    self._write(f"w{i}.bin", chunk, n) for i, chunk in enumerate(chunks)
+                ]), timeout=30)
+            paths = asyncio.run(run())
+            for path, chunk in zip(paths, chunks):
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), chunk * n)
+        self.assertIsNone(get_engine().failed)
+
+    def test_cancelled_writer_keeps_fd_until_op_completes(self):
+        async def run():
+            task = asyncio.create_task(self._write("cancelled.bin", os.urandom(8 << 20), 4))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # a file opened now may get the same fd number; the cancelled op must not land in it
+            return await self._write("next.bin", b"x" * 10, 1)
+        path = asyncio.run(run())
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"x" * 10)
+
+class _DyingEngine(IoUringBatchEngine):
+    def _serve(self):
+        fd, data, offset, loop, fut = self._queue.get()
+        self._in_flight[1] = (data, loop, fut)
+        raise RuntimeError("ring thread crashed")
+
+@unittest.skipIf(get_engine() is None, "io_uring unavailable (needs Linux and `pip install liburing`)")
+class UringEngineFailureTest(unittest.TestCase):
+    def setUp(self):
+        saved = uring_io._ENGINE, uring_io._ENGINE_UNAVAILABLE
+        def restore():
+            uring_io._ENGINE, uring_io._ENGINE_UNAVAILABLE = saved
+        self.addCleanup(restore)
+
+    def test_dead_engine_fails_waiters_and_falls_back(self):
+        engine = _DyingEngine()
+        uring_io._ENGINE, uring_io._ENGINE_UNAVAILABLE = engine, False
+        async def run():
+            with self.assertRaises(OSError):
+                await asyncio.wait_for(engine.write(1, b"x", 0), timeout=5)
+            with self.assertRaises(OSError):
+                engine.write(1, b"x", 0)
+        asyncio.run(run())
+        self.assertIsNone(get_engine())
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "fallback.bin")
+            async def write():
+                async with open_for_write(path) as out:
+                    await out.write(b"fallback")
+            asyncio.run(write())
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"fallback")
+
+if __name__ == "__main__":
+    unittest.main()